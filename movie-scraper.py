@@ -1,13 +1,22 @@
 # scraping
-import requests
-from bs4 import BeautifulSoup
+import requests_cache
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+import lxml.html
+from lxml import etree
+from concurrent.futures import ThreadPoolExecutor
 
 # parsing
 import re
 import dateutil.parser
+from datetime import datetime
+import _strptime # import eagerly; lazy import inside strptime is not thread-safe
 from word2number import w2n
 import string
+import functools
+from itertools import chain
 from pprint import pprint
+import pandas as pd
 
 # storing
 import pickle
@@ -18,281 +27,503 @@ from twilio.rest import TwilioRestClient
 
 # customize output dir and file names below if desired
 outfile_urls = "testdata/all-movie-urls.pkl"
+outfile_rawdata = "testdata/all-movie-data-raw.pkl"
 outfile_moviedata = "testdata/all-movie-data.pkl"
-outfile_failedurls = "testdata/failed-urls.pkl"
+outfile_failedurls = "testdata/failed-urls.txt"
 
-def get_movie_page(url):
+# http caches (sqlite) so re-runs don't re-download unchanged pages; A-Z listing
+# pages gain new movies over time, so they expire sooner than movie pages
+cache_moviepages = "testdata/boxoffice-cache"
+cache_listings = "testdata/boxoffice-listings-cache"
+
+# number of scraped movies between flushes of the output files
+FLUSH_EVERY = 100
+
+# max number of pages fetched at once; also sizes the connection pool so every
+# worker thread can hold its own keep-alive connection
+MAX_WORKERS = 32
+
+def make_session(cache_name, expire_after):
+	"""Create a cached session that reuses pooled keep-alive connections
+	instead of opening a new one per page.
+	Args:
+	cache_name (str) -- path of sqlite cache file (without extension)
+	expire_after (int) -- seconds before a cached page is fetched again
+	"""
+	session = requests_cache.CachedSession(cache_name, backend="sqlite",
+										   expire_after=expire_after)
+	session.headers["Accept-Encoding"] = "gzip, deflate"
+	adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS,
+						  max_retries=Retry(total=3, backoff_factor=0.3,
+											status_forcelist=[429, 500, 502, 503, 504]))
+	session.mount("http://", adapter)
+	session.mount("https://", adapter)
+	return session
+
+# shared sessions for movie pages and A-Z listing pages
+SESSION = make_session(cache_moviepages, expire_after=7*24*3600)
+LISTING_SESSION = make_session(cache_listings, expire_after=3600)
+
+# labels searched for on each movie page
+_FIELD_LABELS = ("MPAA Rating", "Genre:", "Distributor", "Widest", "Production",
+				 "Domestic:", "Domestic Total Adj", "Worldwide", "Academy Awards",
+				 "Release Date", "Close", "Runtime", "Director", "Writer", "Actor",
+				 "Producer")
+
+# compiled xpath queries: text nodes containing any of the labels above, and
+# movie links within the body div of an A-Z listing page
+_FIELD_NODES_XPATH = etree.XPath("//text()[%s]" % " or ".join(
+	'contains(., "%s")' % label for label in _FIELD_LABELS))
+_MOVIE_LINKS_XPATH = etree.XPath(
+	'//div[@id="body"]//a[contains(@href, "movies/?id")]/@href',
+	smart_strings=False)
+# text content of an element as a plain string, so lxml types never end up in
+# the pickled movie data
+_TEXT_XPATH = etree.XPath("string()", smart_strings=False)
+
+def fetch_page(url, session=SESSION):
 	"""
-	Gets movie page as soup object for the provided url.
+	Gets raw html of the page at the provided url.
+	Args:
+		url (str): url of page
+		session (requests.Session): session to fetch with
+	Returns:
+		html (bytes): undecoded response body
+	"""
+	# return bytes rather than response.text: when the server sends no charset,
+	# requests decodes text/html as ISO-8859-1, whereas lxml parsing the bytes
+	# honours the charset declared in the page's meta tag
+	response = session.get(url, timeout=10)
+	html = response.content
+	response.close() # release connection now rather than when garbage collected
+	return html
+
+def get_movie_page(url, session=SESSION):
+	"""
+	Gets movie page as html tree for the provided url.
 	Args:
 		url (str): url of movie page
+		session (requests.Session): session to fetch with
 	Returns:
-		movie_page (soup object): html of movie page
+		movie_page (lxml.html.HtmlElement): html of movie page
 	"""
-	movie_page = BeautifulSoup(requests.get(url).text, "lxml")
+	movie_page = lxml.html.fromstring(fetch_page(url, session))
 	return movie_page
 
-def get_movie_value(soup, field_name, is_people=False):
-	"""Search soup object by keyword and return next
-	sibling or object as text.
+def find_field_nodes(tree):
+	"""Select the text nodes of a movie page html tree that contain a label in
+	_FIELD_LABELS and return a dict mapping each label to the first of them.
+	"""
+	field_nodes = {}
+	for node in _FIELD_NODES_XPATH(tree):
+		for label in _FIELD_LABELS:
+			if label not in field_nodes and label in node:
+				field_nodes[label] = node
+	return field_nodes
+
+def next_element(node):
+	"""Return the first element after a text node in document order, or None.
 	Args:
-	soup -- beautiful soup object
-	field_name (str) -- keyword to search for
+	node -- text node (smart string) returned by an xpath query
+	"""
+	parent = node.getparent()
+	if node.is_tail:
+		# node is the text after parent's closing tag
+		following = parent.itersiblings(tag=etree.Element)
+		ancestors = parent.iterancestors()
+	else:
+		# node is the text before parent's first child
+		following = parent.iterchildren(tag=etree.Element)
+		ancestors = chain([parent], parent.iterancestors())
+	ancestor_siblings = (ancestor.itersiblings(tag=etree.Element) for ancestor in ancestors)
+	return next(chain(following, chain.from_iterable(ancestor_siblings)), None)
+
+def get_movie_value(field_nodes, field_name, is_people=False):
+	"""Look up keyword's text node and return next
+	element as text.
+	Args:
+	field_nodes (dict) -- label text nodes, from find_field_nodes()
+	field_name (str) -- keyword to search for (one of _FIELD_LABELS)
 	is_people (bool) -- set to true if searching for actor,
 	director, producer, or writer; parses findings
 	Returns:
 	string of found text
 	"""
-	obj = soup.find(text=re.compile(field_name))
-	if not obj:
+	obj = field_nodes.get(field_name)
+	if obj is None:
 		return None
-	next_sibling = obj.findNextSibling()
-	next_obj = obj.findNext()
+	next_obj = next_element(obj)
 
 	# for lists of people (actors, dir, prod, etc.), returns html result for
 	# parsing in people_to_list(); else, returns text from object
-	if next_sibling:
-		if is_people:
-			return next_sibling
-		else:
-			return next_sibling.get_text()
-	elif next_obj:
-		if is_people:
-			return next_obj
-		else:
-			return next_obj.get_text()
-	else:
+	if next_obj is None:
 		return None
+	elif is_people:
+		return next_obj
+	else:
+		return _TEXT_XPATH(next_obj)
+
+def memoize(maxsize=65536):
+	"""Decorator caching results of a single-argument cleaning function by its
+	input string. Cleaning functions catch their own errors and return a
+	fallback value, so a failed parse is cached like any other result. The
+	cache is emptied once it holds maxsize entries.
+	"""
+	def decorator(func):
+		cache = {}
+		@functools.wraps(func)
+		def wrapper(arg):
+			try:
+				return cache[arg]
+			except KeyError:
+				if len(cache) >= maxsize:
+					cache.clear()
+				result = cache[arg] = func(arg)
+				return result
+		wrapper.cache = cache
+		return wrapper
+	return decorator
 
 ### functions below for cleaning search results
+_BUDGET_PATTERN = r"\$?([\d.]+)\s+(thousand|million|billion)"
+_BUDGET_UNITS = {"thousand": 1000,
+				 "million": 1000000,
+				 "billion": 1000000000}
+# oscars text reads e.g. "Nominated for three Oscars, won two."
+_NOMS_RE = re.compile(r"\s*[^\s,]+ [^\s,]+ ([^\s,]+)")
+_WINS_RE = re.compile(r",\s*[^\s,]+ ([^\s,.]+)")
+# runtime text reads e.g. "1 hrs. 45 min."
+_RUNTIME_RE = re.compile(r"\s*(\d+)\s+\S+\s+(\d+)")
+
 def clean_title(titlestring):
 	"""Cleans up retrieved movie title."""
-	try:
-		title = str(titlestring.split("(")[0]).strip()
-		return title
-	except:
+	if titlestring is None:
 		return None
+	title = titlestring.partition("(")[0].strip()
+	return title
 
-def to_date(datestring):
-	"""Converts date string to datetime object."""
-	try:
-		date = dateutil.parser.parse(datestring.strip())
+# release/close date formats used by boxofficemojo, tried before dateutil
+_DATE_FORMATS = ("%B %d, %Y", "%b %d, %Y")
+_last_date_format = _DATE_FORMATS[0]
+
+def parse_date(datestring):
+	"""Parses date string with the known formats, falling back to dateutil.
+	The last format that matched is tried first on the next call.
+	"""
+	global _last_date_format
+	last_date_format = _last_date_format
+	other_formats = tuple(f for f in _DATE_FORMATS if f != last_date_format)
+	for date_format in (last_date_format,) + other_formats:
+		try:
+			date = datetime.strptime(datestring, date_format)
+		except ValueError:
+			continue
+		_last_date_format = date_format
 		return date
-	except:
-		return None
+	return dateutil.parser.parse(datestring)
 
-def money_to_int(moneystring):
-	"""Converts dollar figure string into int."""
-	try:
-		moneystring = moneystring.replace("$", "").replace(",", "")
-		return int(moneystring)
-	except:
+@memoize()
+def to_date(datestring):
+	"""Converts date string to datetime object."""
+	if datestring is None:
 		return None
-
-def budget_to_int(budgetstring):
-	"""Converts budget string figure (in format $X million/billion/thousand)
-	into int.
-	"""
 	try:
-		budget_val_list = budgetstring.replace("$", "").split(" ")
-		vals_dict = {"thousand": 1000,
-					 "million": 1000000,
-					 "billion": 1000000000}
-		budget = float(budget_val_list[0]) * vals_dict[budget_val_list[1]]
-		return int(budget)
-	except:
+		date = parse_date(datestring.strip())
+		return date
+	except (ValueError, OverflowError):
 		return None
 
 def people_to_list(peopleobj):
 	if peopleobj is None:
 		return ""
-	else:
-		try:
-			people_list = [str(person.strip("*")) for person in peopleobj.stripped_strings if "(" not in person]
-			return people_list
-		except:
-			return ""
+	people_list = [person.strip().strip("*") for person in peopleobj.itertext()
+				   if person.strip() and "(" not in person]
+	return people_list
 
+@memoize()
 def noms_from_oscars(oscarsstring):
 	"""Converts descriptive oscars text to number of nominations as int."""
+	if oscarsstring is None:
+		return 0
+	match = _NOMS_RE.match(oscarsstring)
+	if match is None:
+		return 0
 	try:
-		nominations_str = (str(oscarsstring.split(",")[0]).strip().lower()).split(" ")
-		nominations = w2n.word_to_num(nominations_str[2])
+		nominations = w2n.word_to_num(str(match.group(1).lower()))
 		return nominations
-	except:
+	except ValueError:
 		return 0
 
+@memoize()
 def wins_from_oscars(oscarsstring):
 	"""Converts descriptive oscars text to number of wins as int."""
+	if oscarsstring is None:
+		return 0
+	match = _WINS_RE.search(oscarsstring)
+	if match is None:
+		return 0
 	try:
-		wins_str = (str(oscarsstring.split(",")[1]).replace(".", "").strip().lower()).split(" ")
-		wins = w2n.word_to_num(wins_str[1])
+		wins = w2n.word_to_num(str(match.group(1).lower()))
 		return wins
-	except:
+	except ValueError:
 		return 0
 
+@memoize()
 def theaters_to_int(theaterstring):
 	"""Converts string of number of theaters into int."""
+	if theaterstring is None:
+		return None
 	try:
-		theaters = theaterstring.strip().replace(",", "").split(" ")[0]
+		theaters = theaterstring.split()[0].replace(",", "")
 		return int(theaters)
-	except:
+	except (IndexError, ValueError):
 		return None
 
+@memoize()
 def runtime_to_minutes(runtimestring):
 	"""Converts runtime string into minutes."""
-	try:
-		runtime = runtimestring.split()
-		minutes = int(runtime[0])*60 + int(runtime[2])
-		return minutes
-	except:
+	if runtimestring is None:
 		return None
+	match = _RUNTIME_RE.match(runtimestring)
+	if match is None:
+		return None
+	minutes = int(match.group(1))*60 + int(match.group(2))
+	return minutes
 
-def get_movie_data(soup):
-	"""Parses soup object of the movie page and returns dictionary of movie
+def get_movie_data(tree):
+	"""Parses html tree of the movie page and returns dictionary of movie
 	features (title, rating, genre, distributor, production budget,
 	domestic total gross, domestic total adjusted gross (2015$), international
 	total gross, oscar nominations, oscar wins, release date, closing date,
 	runtime, director(s), writers, actors, producers.)
 	"""
-	raw_title = soup.find("title").text
+	raw_title = tree.findtext(".//title")
 	title = clean_title(raw_title)
 
-	raw_rating = get_movie_value(soup, "MPAA Rating")
-	rating = str(raw_rating)
-
-	raw_genre = get_movie_value(soup, "Genre:")
-	genre = str(raw_genre)
+	field_nodes = find_field_nodes(tree)
 
-	raw_distributor = get_movie_value(soup, "Distributor")
-	distributor = str(raw_distributor)
+	rating = get_movie_value(field_nodes, "MPAA Rating")
 
-	raw_theaters = get_movie_value(soup, "Widest")
-	theaters = theaters_to_int(raw_theaters)
+	genre = get_movie_value(field_nodes, "Genre:")
 
-	raw_budget = get_movie_value(soup, "Production")
-	budget = budget_to_int(raw_budget)
+	distributor = get_movie_value(field_nodes, "Distributor")
 
-	raw_domestic_total_gross = get_movie_value(soup,"Domestic:")
-	domestic_total_gross = money_to_int(raw_domestic_total_gross)
-
-	raw_domestic_total_adj_gross = get_movie_value(soup,"Domestic Total Adj")
-	domestic_total_adj_gross = money_to_int(raw_domestic_total_adj_gross)
+	raw_theaters = get_movie_value(field_nodes, "Widest")
+	theaters = theaters_to_int(raw_theaters)
 
-	raw_intl_total_gross = get_movie_value(soup, "Worldwide")
-	intl_total_gross = money_to_int(raw_intl_total_gross)
+	# budget, grosses, and dates are kept as raw strings and converted for all
+	# movies at once in clean_movie_data()
+	raw_budget = get_movie_value(field_nodes, "Production")
+	raw_domestic_total_gross = get_movie_value(field_nodes, "Domestic:")
+	raw_domestic_total_adj_gross = get_movie_value(field_nodes, "Domestic Total Adj")
+	raw_intl_total_gross = get_movie_value(field_nodes, "Worldwide")
 
-	raw_oscars = get_movie_value(soup, "Academy Awards")
+	raw_oscars = get_movie_value(field_nodes, "Academy Awards")
 	oscar_noms = noms_from_oscars(raw_oscars)
 	oscar_wins = wins_from_oscars(raw_oscars)
 
-	raw_release_date = get_movie_value(soup,"Release Date")
-	release_date = to_date(raw_release_date)
+	raw_release_date = get_movie_value(field_nodes, "Release Date")
+	raw_closing_date = get_movie_value(field_nodes, "Close")
 
-	raw_closing_date = get_movie_value(soup, "Close")
-	closing_date = to_date(raw_closing_date)
-
-	raw_runtime = get_movie_value(soup,"Runtime")
+	raw_runtime = get_movie_value(field_nodes, "Runtime")
 	runtime = runtime_to_minutes(raw_runtime)
 
-	raw_director = get_movie_value(soup, "Director", is_people=True)
+	raw_director = get_movie_value(field_nodes, "Director", is_people=True)
 	director = people_to_list(raw_director)
 
-	raw_writers = get_movie_value(soup, "Writer", is_people=True)
+	raw_writers = get_movie_value(field_nodes, "Writer", is_people=True)
 	writers = people_to_list(raw_writers)
 
-	raw_actors = get_movie_value(soup, "Actor", is_people=True)
+	raw_actors = get_movie_value(field_nodes, "Actor", is_people=True)
 	actors = people_to_list(raw_actors)
 
-	raw_producers = get_movie_value(soup, "Producer", is_people=True)
+	raw_producers = get_movie_value(field_nodes, "Producer", is_people=True)
 	producers = people_to_list(raw_producers)
 
-	headers = ["1-title", "rating", "genre", "distributor", "theaters", "budget",
-				"dom_total_gross", "domestic_total_adj_gross", "intl_total_gross",
-				"oscar_noms", "oscar_wins", "2-release_date", "3-closing_date",
-				"runtime_mins", "director", "writers", "actors", "producers"]
+	headers = ["1-title", "rating", "genre", "distributor", "theaters", "_raw_budget",
+				"_raw_dom_total_gross", "_raw_domestic_total_adj_gross",
+				"_raw_intl_total_gross", "oscar_noms", "oscar_wins",
+				"_raw_release_date", "_raw_closing_date", "runtime_mins",
+				"director", "writers", "actors", "producers"]
 
 	movie_dict = dict(zip(headers, [title,
 									rating,
 									genre,
 									distributor,
 									theaters,
-									budget,
-									domestic_total_gross,
-									domestic_total_adj_gross,
-									intl_total_gross,
+									raw_budget,
+									raw_domestic_total_gross,
+									raw_domestic_total_adj_gross,
+									raw_intl_total_gross,
 									oscar_noms,
 									oscar_wins,
-									release_date,
-									closing_date,
+									raw_release_date,
+									raw_closing_date,
 									runtime,
 									director, writers, actors, producers]))
 
 	return movie_dict
 
+def clean_movie_data(movie_data):
+	"""Take a list of movie data dicts from get_movie_data() and return a data
+	frame with the raw budget, gross, and date strings converted to numbers and
+	datetimes (NaN/NaT where a value is missing or can't be parsed).
+	"""
+	movies = pd.DataFrame(movie_data)
+	if movies.empty:
+		# nothing scraped, so there are no raw columns to convert
+		return movies
+
+	raw_budget = movies.pop("_raw_budget").str.extract(_BUDGET_PATTERN)
+	movies["budget"] = (pd.to_numeric(raw_budget[0], errors="coerce") *
+						raw_budget[1].map(_BUDGET_UNITS))
+
+	for col in ["dom_total_gross", "domestic_total_adj_gross", "intl_total_gross"]:
+		raw_money = movies.pop("_raw_" + col).str.strip().str.strip("$")
+		movies[col] = pd.to_numeric(raw_money.str.replace(",", ""), errors="coerce")
 
-def get_movies_on_page(soup):
-	"""Given a soup object of an A-Z movie page, return a list of all the movie
+	for col in ["2-release_date", "3-closing_date"]:
+		raw_dates = movies.pop("_raw_" + col.split("-")[1]).str.strip()
+		dates = pd.to_datetime(raw_dates, format=_DATE_FORMATS[0], errors="coerce")
+		# parse the few dates not in the usual format one at a time
+		unparsed = dates.isnull() & raw_dates.notnull()
+		dates[unparsed] = pd.to_datetime(raw_dates[unparsed].map(to_date))
+		movies[col] = dates
+
+	return movies
+
+
+def get_movies_on_page(tree):
+	"""Given an html tree of an A-Z movie page, return a list of all the movie
 	urls on that page. Movie urls point to the individual movie page where we'll
-	be able to extract data.
+	be able to extract data. Each url is listed once even if linked repeatedly.
 	"""
 	movie_urls = []
-	body = soup.body.find(id="body") # look only in div id body
-	movies_on_page = [tag["href"] for tag in body.find_all("a") if "movies/?id" in tag["href"]]
-	movie_urls.extend(movies_on_page)
+	seen = set()
+	for movie_url in _MOVIE_LINKS_XPATH(tree):
+		if movie_url not in seen:
+			seen.add(movie_url)
+			movie_urls.append(movie_url)
 	return movie_urls
 
-def get_movies_from_letters(letter_list):
-	"""Crawl A-Z pages and scrape URLs for all movies listed on those pages.
-	Take a list of letters (#, A-Z) and return a list of all movie urls
-	(suffixes only).
-	"""
-	all_movie_urls = []
+def get_movies_from_listing(letter, page):
+	"""Return list of movie urls (suffixes only) on one A-Z listing page."""
 	url_prefix = "http://www.boxofficemojo.com/movies/alphabetical.htm?letter="
 	url_suffix = "&page="
-	for letter in letter_list:
-		page = 1
-		# checks if there are any movies listed on the given page, append movies
-		# if yes, moves on to next letter if not
-		while True:
-			url = url_prefix + letter + url_suffix + str(page)
-			page_soup = get_movie_page(url)
-			movie_urls = get_movies_on_page(page_soup)
-			all_movie_urls.extend(movie_urls)
-			page += 1
-			if len(movie_urls) == 0:
-				break
-	return all_movie_urls
+	url = url_prefix + letter + url_suffix + str(page)
+	page_tree = get_movie_page(url, LISTING_SESSION)
+	return get_movies_on_page(page_tree)
+
+def get_movies_from_letters(letter_list, probe_pages=4):
+	"""Crawl A-Z pages and scrape URLs for all movies listed on those pages.
+	Take a list of letters (#, A-Z) and return a list of all unique movie urls
+	(suffixes only). Letters are crawled concurrently, fetching the next
+	probe_pages pages of each letter at once.
+	"""
+	all_movie_urls = set()
+	next_page = dict((letter, 1) for letter in letter_list)
+	with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+		while next_page:
+			futures = dict(((letter, page), executor.submit(get_movies_from_listing, letter, page))
+						   for letter, first in next_page.items()
+						   for page in range(first, first + probe_pages))
+			# append movies up to the first empty page, which marks the end of
+			# the letter; if none of the probed pages is empty, probe further
+			for letter, first in sorted(next_page.items()):
+				for page in range(first, first + probe_pages):
+					movie_urls = futures[(letter, page)].result()
+					if len(movie_urls) == 0:
+						del next_page[letter]
+						break
+					all_movie_urls.update(movie_urls)
+				else:
+					next_page[letter] = first + probe_pages
+	return list(all_movie_urls)
 
 def get_num_movies():
 	"""Retrieve data for movies starting with a number, since page structure
 	is built differently than letters.
 	"""
 	url = "http://www.boxofficemojo.com/movies/alphabetical.htm?letter=NUM"
-	page_soup = get_movie_page(url)
-	movie_urls = get_movies_on_page(page_soup)
+	page_tree = get_movie_page(url, LISTING_SESSION)
+	movie_urls = get_movies_on_page(page_tree)
 	return movie_urls
 
-def get_all_movie_data(url_list):
-	"""Take a list of individual movie page urls and return a list of
-	dictionaries of individual movie data.
+def process_movie(movie):
+	"""Fetch and parse a single movie page given its url suffix. Returns a
+	tuple of (movie, movie data dict, None) on success or (movie, None, failed
+	url) on error. Runs in worker threads, so it leaves printing to the caller.
 	"""
 	url_prefix = "http://www.boxofficemojo.com"
 	url_suffix = "&adjust_yr=2015"
-	all_movie_data = []
-	failed_urls = []
-	for movie in url_list:
-		url = url_prefix + movie + url_suffix
-		try:
-			soup = get_movie_page(url)
-			data_dict = get_movie_data(soup)
-			data_dict["url"] = movie.split("=")[1] # add movie url for reference
-			all_movie_data.append(data_dict)
-		except:
-			print "error processing url: " + movie
-			failed_urls.append(url)
-		print "processed: " + movie
-	return all_movie_data, failed_urls
+	url = url_prefix + movie + url_suffix
+	try:
+		tree = get_movie_page(url)
+		data_dict = get_movie_data(tree)
+		data_dict["url"] = movie.split("=")[1] # add movie url for reference
+	except Exception:
+		return movie, None, url
+	return movie, data_dict, None
+
+def get_all_movie_data(url_list, data_path=outfile_rawdata,
+					   failed_path=outfile_failedurls):
+	"""Take a list of individual movie page urls and yield dictionaries of
+	individual movie data as pages are scraped. Pages are fetched concurrently.
+	Each dict is appended to data_path as a pickle (read back with
+	load_movie_data()) and failed urls are appended to failed_path one per
+	line, so progress is kept on disk rather than in memory. Movies already in
+	data_path from a previous run are skipped; failed urls are retried. A partly
+	written record left by a crash is dropped before new records are appended.
+	"""
+	done = get_scraped_ids(data_path)
+	url_list = [movie for movie in url_list if movie.split("=")[1] not in done]
+	print "Skipping", len(done), "already scraped movies."
+	with open(data_path, "ab") as datafile, open(failed_path, "a") as failedfile:
+		with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+			results = executor.map(process_movie, url_list)
+			for count, (movie, data_dict, failed_url) in enumerate(results, 1):
+				if data_dict is not None:
+					pickle.dump(data_dict, datafile, pickle.HIGHEST_PROTOCOL)
+					yield data_dict
+				else:
+					print "error processing url: " + movie
+					failedfile.write(failed_url + "\n")
+				print "processed: " + movie
+				if count % FLUSH_EVERY == 0:
+					datafile.flush()
+					failedfile.flush()
+
+def load_movie_data(path=outfile_rawdata):
+	"""Yield movie data dicts from a file written by get_all_movie_data()."""
+	with open(path, "rb") as picklefile:
+		while True:
+			try:
+				yield pickle.load(picklefile)
+			except EOFError:
+				return
+
+def truncate_partial_record(path=outfile_rawdata):
+	"""Cut off a partly written record left at the end of path by a crash, so
+	that records appended later can still be read back.
+	"""
+	with open(path, "r+b") as picklefile:
+		while True:
+			record_start = picklefile.tell()
+			try:
+				pickle.load(picklefile)
+			except EOFError:
+				break
+			except Exception:
+				print "Dropping partial record at end of", path
+				break
+		picklefile.truncate(record_start)
+
+def get_scraped_ids(path=outfile_rawdata):
+	"""Return set of movie ids (the "url" field) already saved to path."""
+	if not os.path.exists(path):
+		return set()
+	truncate_partial_record(path)
+	return set(data_dict["url"] for data_dict in load_movie_data(path))
 
 def text_me():
 	"""Send a text message when done scraping if env variables TWILIO_SID,
@@ -316,23 +547,24 @@ def main():
 	# get list of all movies, pickle, and return
 	print "Processing movie urls..."
 	letter_list = list(string.ascii_uppercase)
-	all_movies_list = get_movies_from_letters(letter_list)
-	num_movies = get_num_movies()
-	all_movies_list.extend(num_movies)
-	with open(outfile_urls, "w") as picklefile:
-	    pickle.dump(all_movies_list, picklefile)
-	with open(outfile_urls, "r") as picklefile:
-	    loaded_movie_list = pickle.load(picklefile)
+	all_movies = set(get_movies_from_letters(letter_list))
+	all_movies.update(get_num_movies())
+	all_movies_list = list(all_movies)
+	with open(outfile_urls, "wb") as picklefile:
+	    pickle.dump(all_movies_list, picklefile, pickle.HIGHEST_PROTOCOL)
 	print "Done processing movie urls."
 	print "Movie urls saved to: ", outfile_urls
 
-	# get movie data from list of movie urls and pickle
+	# get movie data from list of movie urls, pickling each movie as it's scraped
 	print "Getting movie data..."
-	all_movies_dict, failed_urls = get_all_movie_data(loaded_movie_list)
-	with open(outfile_moviedata, "w") as picklefile:
-		pickle.dump(all_movies_dict, picklefile)
-	with open(outfile_failedurls, "w") as picklefile:
-		pickle.dump(failed_urls, picklefile)
+	num_scraped = sum(1 for _ in get_all_movie_data(all_movies_list))
+	print "Scraped data for", num_scraped, "movies."
+	print "Raw movie data saved to: ", outfile_rawdata
+
+	# convert raw budget, gross, and date strings for every movie scraped so far
+	movies = clean_movie_data(list(load_movie_data()))
+	with open(outfile_moviedata, "wb") as picklefile:
+		pickle.dump(movies.to_dict("records"), picklefile, pickle.HIGHEST_PROTOCOL)
 
 	# get text notification when done
 	text_me()
@@ -49,8 +49,8 @@ def get_data(pgs):
 def main():
     pgs = xrange(1, 2563, 50) # 2563 items with 50 per page
     oscardata = get_data(pgs)
-    with open(outfile, 'w') as picklefile:
-		pickle.dump(oscardata, picklefile)
+    with open(outfile, 'wb') as picklefile:
+		pickle.dump(oscardata, picklefile, pickle.HIGHEST_PROTOCOL)
 
 if __name__ == '__main__':
     main()